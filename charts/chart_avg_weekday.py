@@ -5,6 +5,13 @@ Average occupancy per hour for each weekday with selectable timespan.
 - y-axis: occupancy (%)
 - legend: weekday
 - Plotly dropdown: last 1 month, 3 months, 6 months, all data
+
+Averages come from the incremental weekday x hour profile (profiles.py) when
+available, otherwise they are computed from the full history.
+
+Note: the profile windows are whole calendar days (the last 30/90/180 days
+including today), not a rolling `now - N days` as in the history fallback,
+so averages can differ slightly from the old per-request computation.
 """
 
 from charts.chart_base import ChartBase
@@ -17,16 +24,33 @@ class AverageWeekdayChart(ChartBase):
     name = "avg_weekday"
     title = "Average per Weekday"
     priority = 5
+    uses_profile = True
+
+    def _averages(self, df, span_days):
+        """Mean occupancy per (weekday, hour) over the last span_days days (0 = all)."""
+        if self.profile is not None:
+            return self.profile[self.profile["span"] == span_days][["weekday", "hour", "occupancy"]].copy()
+
+        if span_days > 0:
+            since = datetime.now() - timedelta(days=span_days)
+            df_span = df[df["timestamp"] >= since]
+        else:
+            df_span = df
+        return df_span.groupby(["weekday", "hour"])["occupancy"].mean().reset_index()
 
     def render(self):
-        df = self.df.copy()
-        if df.empty:
-            return {"title": self.title, "html": "<p>No data available.</p>"}
+        if self.profile is not None:
+            if self.profile.empty:
+                return {"title": self.title, "html": "<p>No data available.</p>"}
+            df = None
+        else:
+            df = self.df.copy()
+            if df.empty:
+                return {"title": self.title, "html": "<p>No data available.</p>"}
 
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df["weekday"] = df["timestamp"].dt.weekday
-        df["hour"] = df["timestamp"].dt.hour
-        df["weekday_name"] = df["weekday"].map({0:"Mo",1:"Di",2:"Mi",3:"Do",4:"Fr",5:"Sa",6:"So"})
+            df["timestamp"] = pd.to_datetime(df["timestamp"])
+            df["weekday"] = df["timestamp"].dt.weekday
+            df["hour"] = df["timestamp"].dt.hour
 
         # Define timespans in days
         timespans = [
@@ -40,13 +64,7 @@ class AverageWeekdayChart(ChartBase):
         buttons = []
 
         for span_days, label in timespans:
-            if span_days > 0:
-                since = datetime.now() - timedelta(days=span_days)
-                df_span = df[df["timestamp"] >= since]
-            else:
-                df_span = df
-
-            avg = df_span.groupby(["weekday", "hour"])["occupancy"].mean().reset_index()
+            avg = self._averages(df, span_days)
             avg["weekday_name"] = avg["weekday"].map({0:"Mo",1:"Di",2:"Mi",3:"Do",4:"Fr",5:"Sa",6:"So"})
 
             # Create traces per weekday
@@ -4,23 +4,36 @@ chart_base.py
 Base class for chart plugins. Plugins live in the "charts" package and must
 inherit from ChartBase. They should implement render() returning a dict:
     {"title": "<Title>", "html": "<plotly html>"}
+
+Charts that only look at recent data set `recent_days`; the webserver then
+serves them the last N days from the memory-mapped ring buffer instead of
+the full SQLite history (falling back to SQLite if the ring cannot).
+
+Charts that only need weekday x hour averages set `uses_profile`; they get
+the incrementally maintained profile (see profiles.load_profile) and an
+empty df. Without a profile they get the full history and profile=None.
 """
 
 from abc import ABC, abstractmethod
+from typing import Optional
 
 
 class ChartBase(ABC):
     name: str = "unnamed"
     title: str = "Untitled"
     priority: int = 999
+    recent_days: Optional[int] = None
+    uses_profile: bool = False
 
-    def __init__(self, bath: str, df):
+    def __init__(self, bath: str, df, profile=None):
         """
         :param bath: bath key (table name)
         :param df: pandas DataFrame with the bath data (timestamp parsed as datetime)
+        :param profile: DataFrame (span, weekday, hour, n, occupancy, std) or None
         """
         self.bath = bath
         self.df = df
+        self.profile = profile
 
     @abstractmethod
     def render(self):
@@ -2,29 +2,45 @@
 chart_heatmap_day_by_hour.py
 ----------------
 Heatmap of occupancy by day and hour.
+
+Uses the all-data weekday x hour profile (profiles.py) when available,
+otherwise averages the full history. Either way rows are ordered Mon..Sun.
 """
 
 import plotly.express as px
 import pandas as pd
 from charts.chart_base import ChartBase
 
+WEEKDAY_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
 
 class HeatmapChart(ChartBase):
     name = "heatmap_by_hour_and_day"
     title = "Heatmap per day"
     priority = 2
+    uses_profile = True
 
     def render(self):
-        df = self.df.copy()
-        df["day"] = pd.to_datetime(df["timestamp"]).dt.strftime("%a")
-        df["hour"] = pd.to_datetime(df["timestamp"]).dt.hour
-
-        pivot = (
-            df.groupby(["day", "hour"])["occupancy"]
-            .mean()
-            .reset_index()
-            .pivot(index="day", columns="hour", values="occupancy")
-        )
+        if self.profile is not None:
+            if self.profile.empty:
+                return {"title": self.title, "html": "<p>No data available.</p>"}
+            cells = self.profile[self.profile["span"] == 0]
+            pivot = cells.pivot(index="weekday", columns="hour", values="occupancy")
+        else:
+            df = self.df.copy()
+            df["weekday"] = pd.to_datetime(df["timestamp"]).dt.weekday
+            df["hour"] = pd.to_datetime(df["timestamp"]).dt.hour
+
+            pivot = (
+                df.groupby(["weekday", "hour"])["occupancy"]
+                .mean()
+                .reset_index()
+                .pivot(index="weekday", columns="hour", values="occupancy")
+            )
+
+        # same rows and labels whether the profile exists yet or not
+        pivot = pivot.sort_index()
+        pivot.index = [WEEKDAY_LABELS[wd] for wd in pivot.index]
 
         fig = px.imshow(
             pivot,
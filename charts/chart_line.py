@@ -15,6 +15,7 @@ class LineChart(ChartBase):
     name = "line"
     title = "Line Chart"
     priority = 1
+    recent_days = 28  # current week + 3 weeks before
 
     def render(self):
         df = self.df.copy()
@@ -21,6 +21,7 @@ class WeekdayCompareChart(ChartBase):
     name = "weekday_compare"
     title = "Weekday Comparison"
     priority = 2
+    recent_days = 42  # 6 occurrences of every weekday
 
     def render(self):
         df = self.df.copy()
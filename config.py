@@ -5,20 +5,43 @@ Project configuration and bath definitions. Uses relative paths so the repo
 is portable (works on any host when cloned).
 """
 
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent
 
-DB_FILE = BASE_DIR / "bath_monitor.db"
+# Both can be overridden from the environment, e.g. to run the fetcher and
+# webserver against the local mock API (mock_counter_api.py) and a scratch db.
+DB_FILE = Path(os.environ.get("BATH_MONITOR_DB", BASE_DIR / "bath_monitor.db"))
+COUNTER_API_BASE = os.environ.get("BATH_MONITOR_API_BASE", "https://counter.ticos-systems.cloud").rstrip("/")
 IMAGE_DIR = BASE_DIR / "images"
 
+# Memory-mapped ring buffers of recent samples (see ringbuffer.py), one file
+# per bath next to the database. 49 days covers the line chart (4 weeks) and
+# the weekday comparison (6 weeks); 288 = one sample every 5 minutes.
+RING_DIR = DB_FILE.parent / "ring"
+RING_DAYS = 49
+RING_SAMPLES_PER_DAY = 288
+
+# Rendered pages kept by page_cache.py (gzip + brotli variants only). Chart
+# pages embed plotly.js, so an entry is about 2.8 MB. 56 covers every page
+# (7 baths x up to 7 charts, plus /) so browsing widely does not thrash the
+# cache and pay ~0.3 s of compression per miss; that is ~160 MB when full.
+# Lower it to trade memory for recompression.
+PAGE_CACHE_ENTRIES = 56
+
+# Fetch all baths sharing a counter endpoint with one request
+# (organizationUnitIds=...&organizationUnitIds=...). Set to False to
+# always send one request per bath.
+BATCH_FETCH = True
+
 # Keys used as table names; labels are German for display.
 BATHS = {
-    "olympia": {"label": "Olympia-Schwimmhalle", "apiUrl": "https://counter.ticos-systems.cloud/api/gates/counter?organizationUnitIds=30182"},
-    "north": {"label": "Nordbad", "apiUrl": "https://counter.ticos-systems.cloud/api/gates/counter?organizationUnitIds=30184"},
-    "miller": {"label": "Müllersches Volksbad", "apiUrl": "https://counter.ticos-systems.cloud/api/gates/counter?organizationUnitIds=30197"},
-    "michaeli": {"label": "Michaelibad", "apiUrl": "https://counter.ticos-systems.cloud/api/gates/counter?organizationUnitIds=30208"},
-    "dante": {"label": "Dantebad", "apiUrl": "https://counter.ticos-systems.cloud/api/gates/counter?organizationUnitIds=129"},
-    "west": {"label": "Westbad", "apiUrl": "https://counter.ticos-systems.cloud/api/gates/counter?organizationUnitIds=30199"},
-    "south": {"label": "Südbad", "apiUrl": "https://counter.ticos-systems.cloud/api/gates/counter?organizationUnitIds=30187"},
+    "olympia": {"label": "Olympia-Schwimmhalle", "apiUrl": f"{COUNTER_API_BASE}/api/gates/counter?organizationUnitIds=30182"},
+    "north": {"label": "Nordbad", "apiUrl": f"{COUNTER_API_BASE}/api/gates/counter?organizationUnitIds=30184"},
+    "miller": {"label": "Müllersches Volksbad", "apiUrl": f"{COUNTER_API_BASE}/api/gates/counter?organizationUnitIds=30197"},
+    "michaeli": {"label": "Michaelibad", "apiUrl": f"{COUNTER_API_BASE}/api/gates/counter?organizationUnitIds=30208"},
+    "dante": {"label": "Dantebad", "apiUrl": f"{COUNTER_API_BASE}/api/gates/counter?organizationUnitIds=129"},
+    "west": {"label": "Westbad", "apiUrl": f"{COUNTER_API_BASE}/api/gates/counter?organizationUnitIds=30199"},
+    "south": {"label": "Südbad", "apiUrl": f"{COUNTER_API_BASE}/api/gates/counter?organizationUnitIds=30187"},
 }
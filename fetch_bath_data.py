@@ -6,13 +6,171 @@ Fetches current visitor counts from Munich baths API and stores them
 in a SQLite database. One table per bath key is used. Occupancy
 is stored with 1 decimal precision.
 
+Each stored sample is also appended to the bath's memory-mapped ring buffer
+of recent data (ringbuffer.py), which the webserver reads without SQLite,
+and to the bath's weekday x hour occupancy profile (profiles.py).
+
+Baths sharing the same counter endpoint are fetched with a single batched
+request (all organizationUnitIds at once); if the batch fails, the affected
+baths fall back to one request each.
+
 This script should be scheduled via cron.
 """
 
 import requests
 import sqlite3
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime
-from config import BATHS, DB_FILE
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config import BATCH_FETCH, BATHS, DB_FILE
+from profiles import ensure_profile, update_profile
+from ringbuffer import discard, open_for_append, to_epoch
+
+UNIT_IDS_PARAM = "organizationUnitIds"
+
+
+def split_api_url(api_url: str) -> Tuple[str, Optional[int]]:
+    """
+    Split a bath apiUrl into (endpoint, organization unit id).
+
+    The endpoint keeps all query parameters except organizationUnitIds, so
+    baths with identical endpoints can share one request. The unit id is
+    None if the url does not carry exactly one numeric id.
+    """
+    parts = urlsplit(api_url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    unit_ids = [value for name, value in query if name == UNIT_IDS_PARAM]
+    rest = [(name, value) for name, value in query if name != UNIT_IDS_PARAM]
+    endpoint = urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(rest), parts.fragment))
+
+    if len(unit_ids) != 1 or not unit_ids[0].isdigit():
+        return endpoint, None
+    return endpoint, int(unit_ids[0])
+
+
+def group_baths_by_endpoint(baths: Dict[str, dict]) -> Tuple[Dict[str, Dict[int, str]], List[str]]:
+    """
+    Group bath keys by counter endpoint.
+
+    Returns ({endpoint: {unit_id: bath_key}}, [bath keys that cannot be batched]).
+    """
+    groups: Dict[str, Dict[int, str]] = defaultdict(dict)
+    single: List[str] = []
+    for key, bath in baths.items():
+        endpoint, unit_id = split_api_url(bath["apiUrl"])
+        if unit_id is None or unit_id in groups[endpoint]:
+            single.append(key)
+        else:
+            groups[endpoint][unit_id] = key
+    return {endpoint: units for endpoint, units in groups.items() if units}, single
+
+
+def fetch_batch(endpoint: str, unit_ids: List[int]) -> Dict[int, dict]:
+    """
+    Request counters for several organization units with one HTTP call.
+
+    The ids are sent as repeated organizationUnitIds parameters. Returns the
+    response entries keyed by organizationUnitId.
+    """
+    params = [(UNIT_IDS_PARAM, unit_id) for unit_id in unit_ids]
+    response = requests.get(endpoint, params=params, timeout=10)
+    response.raise_for_status()
+    data = response.json()
+
+    if not isinstance(data, list):
+        raise ValueError(f"unexpected batch response: {type(data).__name__}")
+
+    # ids are matched as int (the keys come from split_api_url); entries whose
+    # id does not parse are skipped and their baths fall back to single requests
+    by_unit: Dict[int, dict] = {}
+    for entry in data:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            by_unit[int(entry["organizationUnitId"])] = entry
+        except (KeyError, TypeError, ValueError):
+            continue
+    return by_unit
+
+
+def fetch_single(api_url: str) -> Optional[dict]:
+    """Request the counter for one bath. Returns the first entry or None."""
+    response = requests.get(api_url, timeout=10)
+    response.raise_for_status()
+    data = response.json()
+
+    if not data or not isinstance(data, list):
+        return None
+    return data[0]
+
+
+def fetch_entries(baths: Dict[str, dict], batch: bool = BATCH_FETCH) -> Dict[str, Optional[dict]]:
+    """
+    Fetch the current counter entry for every bath.
+
+    With batch=True, one request is sent per distinct endpoint and the result
+    list is demultiplexed by organizationUnitId. Baths missing from a batch
+    response, or whose batch failed, are retried with a single request.
+    Returns {bath_key: entry or None}; errors are reported and yield None.
+    """
+    entries: Dict[str, Optional[dict]] = {}
+    pending = list(baths)
+
+    if batch:
+        groups, pending = group_baths_by_endpoint(baths)
+        for endpoint, units in groups.items():
+            try:
+                by_unit = fetch_batch(endpoint, list(units))
+            except Exception as err:
+                print(f"⚠️ Batch request to {endpoint} failed, falling back to single requests: {err}")
+                by_unit = {}
+
+            for unit_id, key in units.items():
+                if unit_id in by_unit:
+                    entries[key] = by_unit[unit_id]
+                else:
+                    pending.append(key)
+
+    for key in pending:
+        bath = baths[key]
+        try:
+            entries[key] = fetch_single(bath["apiUrl"])
+        except Exception as err:
+            print(f"❌ Error fetching {bath['label']}: {err}")
+            entries[key] = None
+
+    return entries
+
+
+def ensure_table(cursor: sqlite3.Cursor, key: str) -> None:
+    """Create the bath table and its timestamp index if missing."""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {key} (
+            timestamp TEXT,
+            bath_id INTEGER,
+            bath_name TEXT,
+            personCount INTEGER,
+            maxPersonCount INTEGER,
+            occupancy REAL
+        )
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{key}_timestamp ON {key}(timestamp)")
+
+
+@contextmanager
+def savepoint(cursor: sqlite3.Cursor, name: str):
+    """Run a block in a SAVEPOINT; all of its writes are rolled back if it raises."""
+    cursor.execute(f"SAVEPOINT {name}")
+    try:
+        yield
+    except Exception:
+        cursor.execute(f"ROLLBACK TO {name}")
+        cursor.execute(f"RELEASE {name}")
+        raise
+    cursor.execute(f"RELEASE {name}")
 
 
 def fetch_data():
@@ -24,51 +182,76 @@ def fetch_data():
     rounded to 1 decimal.
     """
     timestamp = datetime.now().isoformat(timespec="seconds")
+    entries = fetch_entries(BATHS)
+    ring_samples = []
 
     with sqlite3.connect(DB_FILE) as conn:
         cursor = conn.cursor()
+        # one transaction per run: sqlite3 does not open one implicitly for
+        # DDL, SELECT or SAVEPOINT, so without it every RELEASE below would
+        # commit on its own and readers could see a half-applied run
+        cursor.execute("BEGIN")
 
         for key, bath in BATHS.items():
             table_name = key
-            # Create table if missing
-            cursor.execute(f"""
-                CREATE TABLE IF NOT EXISTS {table_name} (
-                    timestamp TEXT,
-                    bath_id INTEGER,
-                    bath_name TEXT,
-                    personCount INTEGER,
-                    maxPersonCount INTEGER,
-                    occupancy REAL
-                )
-            """)
-            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{key}_timestamp ON {table_name}(timestamp)")
+            ensure_table(cursor, table_name)
 
             try:
-                response = requests.get(bath["apiUrl"], timeout=10)
-                response.raise_for_status()
-                data = response.json()
+                # opened before the insert: a new ring is seeded from the table
+                ring = open_for_append(key, cursor)
+            except Exception as err:
+                print(f"⚠️ Ring buffer unavailable for {bath['label']}: {err}")
+                ring = None
+                discard(key)
 
-                if not data or not isinstance(data, list):
-                    print(f"⚠️ No data received for {bath['label']}")
-                    continue
+            # built from history on first use, so also before the insert;
+            # a failed build leaves no tables and is retried next run
+            try:
+                with savepoint(cursor, "profile_build"):
+                    ensure_profile(cursor, key)
+                profile_ready = True
+            except Exception as err:
+                print(f"⚠️ Profile unavailable for {bath['label']}: {err}")
+                profile_ready = False
+
+            entry = entries.get(key)
+            if entry is None:
+                print(f"⚠️ No data received for {bath['label']}")
+                continue
 
-                entry = data[0]
+            try:
                 bath_id = entry["organizationUnitId"]
                 person_count = entry["personCount"]
                 max_person_count = entry["maxPersonCount"]
                 occupancy = round((person_count / max_person_count * 100) if max_person_count else 0, 1)
 
-                cursor.execute(
-                    f"INSERT INTO {table_name} VALUES (?, ?, ?, ?, ?, ?)",
-                    (timestamp, bath_id, bath["label"], person_count, max_person_count, occupancy),
-                )
+                # sample and profile update are stored together or not at all:
+                # the profile is never rescanned, so a partial update would stick
+                with savepoint(cursor, "sample"):
+                    cursor.execute(
+                        f"INSERT INTO {table_name} VALUES (?, ?, ?, ?, ?, ?)",
+                        (timestamp, bath_id, bath["label"], person_count, max_person_count, occupancy),
+                    )
+                    if profile_ready:
+                        update_profile(cursor, table_name, timestamp, occupancy)
                 print(f"✅ {timestamp}: {bath['label']} → {occupancy:.1f}%")
+                if ring is not None:
+                    ring_samples.append((ring, key, bath, person_count, occupancy))
 
             except Exception as err:
-                print(f"❌ Error fetching {bath['label']}: {err}")
+                print(f"❌ Error storing {bath['label']}: {err}")
 
         conn.commit()
 
+    # only append what was committed, so the ring never holds more than SQLite
+    epoch = to_epoch(timestamp)
+    for ring, key, bath, person_count, occupancy in ring_samples:
+        try:
+            ring.append(epoch, person_count, occupancy)
+        except Exception as err:
+            print(f"⚠️ Could not append to ring buffer for {bath['label']}: {err}")
+            discard(key)
+
 
 if __name__ == "__main__":
     fetch_data()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+load_test.py
+
+End-to-end load test of fetcher and webserver against the local mock API.
+
+Starts mock_counter_api and webserver in-process on free ports, points the
+config at the mock and at a scratch database (seeded with synthetic
+history), then for --duration seconds:
+    - runs fetch_data() every --fetch-interval seconds
+    - sends concurrent requests to / and /<bath>/<chart> from --clients threads
+
+Reports throughput and p50/p99 latency per route, fetcher run times and
+SQLite lock contention (statement wait times, commit times, "database is
+locked" errors).
+
+Example:
+    python load_test.py --duration 30 --clients 8 --fetch-interval 0.5 --latency 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import logging
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import requests
+from werkzeug.serving import make_server
+
+import mock_counter_api
+
+# keep a handle on the real connect; the harness wraps it for instrumentation
+_sqlite_connect = sqlite3.connect
+
+
+class ContentionStats:
+    """Thread-safe collector of SQLite timings (seconds) and lock errors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.read_waits: List[float] = []
+        self.write_waits: List[float] = []
+        self.commits: List[float] = []
+        self.locked_errors = 0
+
+    def record(self, kind: str, seconds: float):
+        with self._lock:
+            getattr(self, kind).append(seconds)
+
+    def locked(self):
+        with self._lock:
+            self.locked_errors += 1
+
+
+STATS = ContentionStats()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor timing every statement; SELECTs count as reads, all else as writes."""
+
+    def execute(self, sql, *args):
+        kind = "read_waits" if sql.lstrip().upper().startswith("SELECT") else "write_waits"
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        except sqlite3.OperationalError as err:
+            if "locked" in str(err):
+                STATS.locked()
+            raise
+        finally:
+            STATS.record(kind, time.perf_counter() - start)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection handing out InstrumentedCursor and timing commits."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        except sqlite3.OperationalError as err:
+            if "locked" in str(err):
+                STATS.locked()
+            raise
+        finally:
+            STATS.record("commits", time.perf_counter() - start)
+
+
+def instrumented_connect(*args, **kwargs):
+    kwargs.setdefault("factory", InstrumentedConnection)
+    return _sqlite_connect(*args, **kwargs)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def start_server(app, host: str = "127.0.0.1"):
+    """Serve a WSGI app on a free port in a daemon thread. Returns the server."""
+    server = make_server(host, 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def seed_history(baths: Dict[str, dict], days: int, step_minutes: int = 5):
+    """Fill the (scratch) database with synthetic samples for the last N days."""
+    from fetch_bath_data import ensure_table, split_api_url
+    from config import DB_FILE
+
+    rng = random.Random(0)
+    now = datetime.now().replace(second=0, microsecond=0)
+    start = now - timedelta(days=days)
+    with _sqlite_connect(DB_FILE) as conn:
+        cursor = conn.cursor()
+        for key, bath in baths.items():
+            ensure_table(cursor, key)
+            _, unit_id = split_api_url(bath["apiUrl"])
+            unit_id = unit_id or 0
+            capacity = mock_counter_api.max_person_count(unit_id)
+            rows = []
+            moment = start
+            while moment < now:
+                count = mock_counter_api.person_count(moment, unit_id, rng)
+                if count or mock_counter_api.occupancy_curve(moment, unit_id):
+                    occupancy = round(count / capacity * 100, 1)
+                    rows.append((moment.isoformat(timespec="seconds"), unit_id, bath["label"], count, capacity, occupancy))
+                moment += timedelta(minutes=step_minutes)
+            cursor.executemany(f"INSERT INTO {key} VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+
+
+def run_fetcher(stop: threading.Event, interval: float, durations: List[float], errors: List[str]):
+    """Call fetch_data() every `interval` seconds until stopped."""
+    from fetch_bath_data import fetch_data
+
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            fetch_data()
+        except Exception as err:
+            errors.append(str(err))
+        durations.append(time.perf_counter() - start)
+        stop.wait(max(0.0, interval - (time.perf_counter() - start)))
+
+
+def run_client(stop: threading.Event, base_url: str, paths: List[str], seed: int,
+               latencies: Dict[str, List[float]], failures: Dict[str, int], lock: threading.Lock):
+    """Request random pages until stopped, recording latency per route kind."""
+    rng = random.Random(seed)
+    session = requests.Session()
+    while not stop.is_set():
+        path = rng.choice(paths)
+        route = "/" if path == "/" else "/<bath>/<chart>"
+        start = time.perf_counter()
+        try:
+            ok = session.get(base_url + path, timeout=60).status_code == 200
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies[route].append(elapsed)
+            if not ok:
+                failures[route] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test fetcher + webserver against the mock counter API.")
+    parser.add_argument("--duration", type=float, default=30.0, help="test duration in seconds")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent HTTP client threads")
+    parser.add_argument("--fetch-interval", type=float, default=0.5, help="seconds between fetcher runs")
+    parser.add_argument("--landing-share", type=float, default=0.3, help="share of requests going to /")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock API mean latency in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="mock API latency standard deviation in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock API share of 503 answers")
+    parser.add_argument("--seed-days", type=int, default=30, help="days of synthetic history to seed")
+    parser.add_argument("--db", type=Path, default=None, help="new scratch database (default: temp file)")
+    parser.add_argument("--reuse-db", action="store_true",
+                        help="allow an existing --db: no seeding, but the fetcher still writes samples to it")
+    args = parser.parse_args()
+
+    # seeding an existing database (e.g. bath_monitor.db) would mix synthetic rows into real history
+    if args.db is not None and args.db.exists() and not args.reuse_db:
+        parser.error(f"{args.db} already exists; pass --reuse-db to run against it without seeding")
+    if args.reuse_db and args.db is None:
+        parser.error("--reuse-db needs --db")
+
+    # werkzeug logs every request of both servers to stderr; keep the report readable
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    mock = start_server(mock_counter_api.create_app(args.latency, args.jitter, args.error_rate, seed=0))
+    tmp_dir = None
+    if args.db is None:
+        tmp_dir = tempfile.TemporaryDirectory(prefix="bath_monitor_load_")
+        args.db = Path(tmp_dir.name) / "load_test.db"
+    args.db.parent.mkdir(parents=True, exist_ok=True)
+
+    # config reads these at import time, so set them before importing it
+    os.environ["BATH_MONITOR_API_BASE"] = f"http://127.0.0.1:{mock.server_port}"
+    os.environ["BATH_MONITOR_DB"] = str(args.db)
+    from config import BATHS
+    import webserver
+
+    if args.reuse_db:
+        print(f"Reusing {args.db} without seeding ...")
+    else:
+        print(f"Seeding {args.seed_days} days of history into {args.db} ...")
+        seed_history(BATHS, args.seed_days)
+
+    sqlite3.connect = instrumented_connect
+    web = start_server(webserver.app)
+    base_url = f"http://127.0.0.1:{web.server_port}"
+
+    chart_paths = [f"/{bath}/{chart.name}" for bath in BATHS for chart in webserver.CHART_CLASSES]
+    landing_weight = max(1, int(round(len(chart_paths) * args.landing_share / max(1e-9, 1 - args.landing_share))))
+    paths = ["/"] * landing_weight + chart_paths
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    failures: Dict[str, int] = defaultdict(int)
+    fetch_durations: List[float] = []
+    fetch_errors: List[str] = []
+
+    threads = [threading.Thread(target=run_fetcher, args=(stop, args.fetch_interval, fetch_durations, fetch_errors))]
+    threads += [
+        threading.Thread(target=run_client, args=(stop, base_url, paths, i, latencies, failures, lock))
+        for i in range(args.clients)
+    ]
+
+    print(f"Running for {args.duration:.0f}s: {args.clients} clients, fetcher every {args.fetch_interval}s ...")
+    started = time.perf_counter()
+    # the fetcher prints one line per bath and run; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        for t in threads:
+            t.start()
+        time.sleep(args.duration)
+        stop.set()
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - started
+
+    sqlite3.connect = _sqlite_connect
+    web.shutdown()
+    mock.shutdown()
+
+    def ms(values: List[float], pct: float) -> str:
+        return f"{percentile(values, pct) * 1000:8.1f} ms"
+
+    print()
+    print(f"{'route':<18}{'requests':>10}{'req/s':>10}{'failed':>8}{'p50':>12}{'p99':>12}")
+    for route in ("/", "/<bath>/<chart>"):
+        values = latencies.get(route, [])
+        print(f"{route:<18}{len(values):>10}{len(values) / elapsed:>10.1f}{failures.get(route, 0):>8}"
+              f"{ms(values, 50):>12}{ms(values, 99):>12}")
+    total = sum(len(v) for v in latencies.values())
+    print(f"{'total':<18}{total:>10}{total / elapsed:>10.1f}")
+
+    print()
+    print(f"fetcher runs:        {len(fetch_durations)} ({len(fetch_errors)} failed), "
+          f"p50 {ms(fetch_durations, 50).strip()}, p99 {ms(fetch_durations, 99).strip()}")
+    print(f"sqlite reads:        {len(STATS.read_waits)}, "
+          f"p50 {ms(STATS.read_waits, 50).strip()}, p99 {ms(STATS.read_waits, 99).strip()}")
+    print(f"sqlite writes:       {len(STATS.write_waits)}, "
+          f"p50 {ms(STATS.write_waits, 50).strip()}, p99 {ms(STATS.write_waits, 99).strip()}")
+    print(f"sqlite commits:      {len(STATS.commits)}, "
+          f"p50 {ms(STATS.commits, 50).strip()}, p99 {ms(STATS.commits, 99).strip()}")
+    print(f"'database is locked' errors: {STATS.locked_errors}")
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
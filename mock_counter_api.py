@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+mock_counter_api.py
+
+Local stand-in for the ticos gates/counter API, for offline development and
+load tests. Serves GET /api/gates/counter?organizationUnitIds=... with the
+same shape as the real endpoint: a list of
+    {"organizationUnitId": int, "personCount": int, "maxPersonCount": int}
+
+Occupancy follows a synthetic daily curve (closed at night, midday and
+after-work peaks, busier weekends) plus noise. Latency and error rate are
+configurable.
+
+Point the fetcher at it via the environment:
+    python mock_counter_api.py --port 5050 --latency 80 --error-rate 0.05
+    BATH_MONITOR_API_BASE=http://127.0.0.1:5050 python fetch_bath_data.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import random
+import time
+from datetime import datetime
+from typing import Optional
+
+from flask import Flask, jsonify, request
+
+# Opening hours of the synthetic baths (decimal hours, local time)
+OPEN_HOUR = 7.0
+CLOSE_HOUR = 23.0
+
+
+def max_person_count(unit_id: int) -> int:
+    """Deterministic capacity per organization unit (between 150 and 600)."""
+    return 150 + (unit_id * 7919) % 451
+
+
+def occupancy_curve(moment: datetime, unit_id: int) -> float:
+    """
+    Expected occupancy (0..1) for a unit at a given moment, without noise.
+
+    Two gaussian bumps: a midday peak and a larger after-work peak on
+    weekdays; on weekends a single broad early-afternoon peak. Each unit gets
+    a slightly different overall popularity.
+    """
+    hour = moment.hour + moment.minute / 60.0
+    if hour < OPEN_HOUR or hour >= CLOSE_HOUR:
+        return 0.0
+
+    def bump(center: float, width: float, height: float) -> float:
+        return height * math.exp(-((hour - center) ** 2) / (2 * width ** 2))
+
+    popularity = 0.75 + (unit_id % 5) * 0.07
+    if moment.weekday() >= 5:
+        level = bump(14.5, 2.8, 0.75) + bump(10.0, 1.5, 0.15)
+    else:
+        level = bump(12.5, 1.3, 0.35) + bump(18.5, 1.6, 0.6) + bump(7.5, 0.6, 0.15)
+    return min(1.0, level * popularity)
+
+
+def person_count(moment: datetime, unit_id: int, rng: random.Random) -> int:
+    """Noisy person count for a unit at a given moment."""
+    capacity = max_person_count(unit_id)
+    expected = occupancy_curve(moment, unit_id) * capacity
+    if expected <= 0:
+        return 0
+    noisy = rng.gauss(expected, max(1.0, expected * 0.06))
+    return max(0, min(capacity, int(round(noisy))))
+
+
+def create_app(latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+               seed: Optional[int] = None) -> Flask:
+    """
+    Build the mock API app.
+
+    :param latency_ms: mean added response latency
+    :param jitter_ms: standard deviation of the added latency
+    :param error_rate: probability (0..1) of answering with HTTP 503
+    :param seed: seed for the random generator (noise, latency, errors)
+    """
+    app = Flask(__name__)
+    rng = random.Random(seed)
+
+    @app.route("/api/gates/counter")
+    def counter():
+        if latency_ms or jitter_ms:
+            time.sleep(max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000.0)
+        if error_rate and rng.random() < error_rate:
+            return jsonify({"error": "mock failure"}), 503
+
+        # accept repeated parameters as well as comma separated lists
+        unit_ids = []
+        for raw in request.args.getlist("organizationUnitIds"):
+            unit_ids.extend(int(part) for part in raw.split(",") if part.strip().isdigit())
+
+        now = datetime.now()
+        return jsonify([
+            {
+                "organizationUnitId": unit_id,
+                "personCount": person_count(now, unit_id, rng),
+                "maxPersonCount": max_person_count(unit_id),
+            }
+            for unit_id in unit_ids
+        ])
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the ticos gates/counter API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean latency in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency standard deviation in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.jitter, args.error_rate, args.seed)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
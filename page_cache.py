@@ -0,0 +1,132 @@
+"""
+page_cache.py
+
+HTTP validators and precompressed variants for rendered pages.
+
+Pages only change when the fetcher stores a new sample (or the day changes,
+since charts default to "today"). cached_page() therefore derives an ETag and
+Last-Modified from the data version, answers If-None-Match /
+If-Modified-Since with 304, and otherwise serves the gzip or brotli variant
+stored at render time, negotiated via Accept-Encoding. Only compressed
+variants are kept; the rare client without gzip gets it decompressed on
+demand.
+
+Each encoding gets its own ETag ("<tag>-gzip", "<tag>-br") as the bytes
+differ; If-None-Match accepts any of them for the same page version.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, time as dtime, timezone
+from typing import Callable, Dict, NamedTuple, Optional
+
+from flask import Response, request
+
+from config import PAGE_CACHE_ENTRIES
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip and identity are offered
+    brotli = None
+
+# part of every ETag and a lower bound of Last-Modified, so a restart (new
+# templates/charts) invalidates clients using either validator
+STARTED_AT = datetime.fromtimestamp(time.time(), timezone.utc)
+STARTED = STARTED_AT.isoformat()
+
+ENCODINGS = ["br", "gzip", "identity"] if brotli is not None else ["gzip", "identity"]
+
+
+class CachedPage(NamedTuple):
+    etag: str
+    last_modified: datetime
+    variants: Dict[str, bytes]
+
+
+_pages: "OrderedDict[str, CachedPage]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    variants = {"gzip": gzip.compress(body, compresslevel=6)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=5)
+    return variants
+
+
+def last_modified_for(latest: Optional[str], today: date) -> datetime:
+    """
+    Latest of the newest sample (naive local ISO timestamp), today's local
+    midnight and the process start, in UTC.
+    """
+    moment = datetime.combine(today, dtime())
+    if latest:
+        moment = max(moment, datetime.fromisoformat(latest))
+    # naive values are local time; HTTP dates have whole seconds
+    return max(moment.astimezone(timezone.utc), STARTED_AT).replace(microsecond=0)
+
+
+def _base_tag(tag: str) -> str:
+    for encoding in ENCODINGS:
+        if tag.endswith(f"-{encoding}"):
+            return tag[: -len(encoding) - 1]
+    return tag
+
+
+def _not_modified(etag: str, last_modified: datetime) -> bool:
+    if request.headers.get("If-None-Match"):
+        tags = request.if_none_match
+        return tags.star_tag or any(_base_tag(tag) == etag for tag in tags.as_set(include_weak=True))
+    since = request.if_modified_since
+    return since is not None and last_modified <= since
+
+
+def _respond(status: int, etag: str, encoding: str, last_modified: datetime, body: bytes = b"") -> Response:
+    response = Response(body, status=status, mimetype="text/html")
+    response.set_etag(etag if encoding == "identity" else f"{etag}-{encoding}")
+    response.last_modified = last_modified
+    response.headers["Vary"] = "Accept-Encoding"
+    # always revalidate: the page changes with every new sample
+    response.headers["Cache-Control"] = "no-cache"
+    if status == 200 and encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def cached_page(key: str, latest: Optional[str], render: Callable[[], str]) -> Response:
+    """
+    Serve a page identified by `key` whose content depends on data version
+    `latest` (latest stored timestamp). `render` is only called if no
+    variant for this version is cached.
+    """
+    today = date.today()
+    etag = hashlib.sha1(f"{key}|{latest}|{today.isoformat()}|{STARTED}".encode()).hexdigest()[:20]
+    last_modified = last_modified_for(latest, today)
+    encoding = request.accept_encodings.best_match(ENCODINGS, default="identity")
+
+    if _not_modified(etag, last_modified):
+        return _respond(304, etag, encoding, last_modified)
+
+    with _lock:
+        page = _pages.get(key)
+        if page is not None and page.etag == etag:
+            _pages.move_to_end(key)
+
+    if page is None or page.etag != etag:
+        page = CachedPage(etag, last_modified, compress_variants(render().encode("utf-8")))
+        with _lock:
+            _pages[key] = page
+            _pages.move_to_end(key)
+            while len(_pages) > PAGE_CACHE_ENTRIES:
+                _pages.popitem(last=False)
+
+    if encoding == "identity":
+        body = gzip.decompress(page.variants["gzip"])
+    else:
+        body = page.variants[encoding]
+    return _respond(200, etag, encoding, last_modified, body)
@@ -0,0 +1,233 @@
+"""
+profiles.py
+
+Incremental weekday x hour occupancy profiles per bath.
+
+The fetcher feeds every stored sample into streaming mean/variance
+accumulators (Welford) for each (weekday, hour) cell, separately for the
+rolling windows in SPANS (days; 0 = all data). Charts then read 7 x 24
+cells per window instead of scanning the full history.
+
+Tables per bath (same database as the samples):
+    <bath>_profile       (span, weekday, hour, n, mean, m2)  window accumulators
+    <bath>_profile_day   (day, hour, n, mean, m2)            per-day partials
+    <bath>_profile_span  (span, start_day)                   first day in window
+
+Per-day partials are kept for the longest rolling window. When a day leaves
+a window its partials are subtracted from the window accumulators (inverse
+of the parallel merge), so expiry never rescans samples.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from config import DB_FILE
+
+SPANS = (30, 90, 180, 0)
+ROLLING_SPANS = tuple(span for span in SPANS if span > 0)
+KEEP_DAYS = max(ROLLING_SPANS)
+
+
+@dataclass
+class Welford:
+    """Streaming count / mean / sum of squared deviations."""
+
+    n: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def add(self, value: float):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other: "Welford"):
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+
+    def remove(self, other: "Welford"):
+        """Undo merge(other)."""
+        n = self.n - other.n
+        if n <= 0:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        mean = (self.n * self.mean - other.n * other.mean) / n
+        delta = other.mean - mean
+        self.m2 = max(0.0, self.m2 - other.m2 - delta * delta * n * other.n / self.n)
+        self.mean = mean
+        self.n = n
+
+    @property
+    def std(self) -> float:
+        return (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else 0.0
+
+
+def span_start(today: date, span: int) -> date:
+    """
+    First day inside a rolling window of `span` days ending today.
+
+    Windows are whole calendar days (today plus span - 1 days before), not
+    `now - timedelta(days=span)`, so they only move at day boundaries.
+    """
+    return today - timedelta(days=span - 1)
+
+
+def has_profile(cursor: sqlite3.Cursor, bath: str) -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f"{bath}_profile_span",))
+    return cursor.fetchone() is not None
+
+
+def ensure_profile(cursor: sqlite3.Cursor, bath: str, today: Optional[date] = None):
+    """
+    Create the profile tables of a bath if missing and build them once from
+    the stored history. Call before inserting the current sample.
+    """
+    if has_profile(cursor, bath):
+        return
+    today = today or date.today()
+
+    # leftovers of an interrupted build
+    cursor.execute(f"DROP TABLE IF EXISTS {bath}_profile")
+    cursor.execute(f"DROP TABLE IF EXISTS {bath}_profile_day")
+    cursor.execute(f"""
+        CREATE TABLE {bath}_profile (
+            span INTEGER, weekday INTEGER, hour INTEGER,
+            n INTEGER, mean REAL, m2 REAL,
+            PRIMARY KEY (span, weekday, hour)
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE {bath}_profile_day (
+            day TEXT, hour INTEGER,
+            n INTEGER, mean REAL, m2 REAL,
+            PRIMARY KEY (day, hour)
+        )
+    """)
+
+    # one pass over the history: per-day partials, merged into the windows below
+    days: Dict[Tuple[str, int], Welford] = {}
+    cursor.execute(f"SELECT timestamp, occupancy FROM {bath} ORDER BY timestamp")
+    for timestamp, occupancy in cursor:
+        if occupancy is None:
+            continue
+        days.setdefault((timestamp[:10], int(timestamp[11:13])), Welford()).add(occupancy)
+
+    windows: Dict[Tuple[int, int, int], Welford] = {}
+    for (day, hour), acc in days.items():
+        day_date = date.fromisoformat(day)
+        for span in SPANS:
+            if span == 0 or day_date >= span_start(today, span):
+                windows.setdefault((span, day_date.weekday(), hour), Welford()).merge(acc)
+
+    keep_from = span_start(today, KEEP_DAYS).isoformat()
+    cursor.executemany(
+        f"INSERT INTO {bath}_profile VALUES (?, ?, ?, ?, ?, ?)",
+        [(span, wd, hour, acc.n, acc.mean, acc.m2) for (span, wd, hour), acc in windows.items()],
+    )
+    cursor.executemany(
+        f"INSERT INTO {bath}_profile_day VALUES (?, ?, ?, ?, ?)",
+        [(day, hour, acc.n, acc.mean, acc.m2) for (day, hour), acc in days.items() if day >= keep_from],
+    )
+    # created last: its existence marks a complete build
+    cursor.execute(f"CREATE TABLE {bath}_profile_span (span INTEGER PRIMARY KEY, start_day TEXT)")
+    cursor.executemany(
+        f"INSERT INTO {bath}_profile_span VALUES (?, ?)",
+        [(span, span_start(today, span).isoformat()) for span in ROLLING_SPANS],
+    )
+
+
+def _load_cell(cursor: sqlite3.Cursor, table: str, where: str, args: tuple) -> Welford:
+    cursor.execute(f"SELECT n, mean, m2 FROM {table} WHERE {where}", args)
+    row = cursor.fetchone()
+    return Welford(*row) if row else Welford()
+
+
+def _pending_expiry(cursor: sqlite3.Cursor, bath: str, today: date) -> Iterable[Tuple[int, int, int, Welford]]:
+    """(span, weekday, hour, partial) of days that left a window since the fetcher last ran."""
+    cursor.execute(f"SELECT span, start_day FROM {bath}_profile_span")
+    for span, start_day in cursor.fetchall():
+        new_start = span_start(today, span).isoformat()
+        if start_day >= new_start:
+            continue
+        cursor.execute(
+            f"SELECT day, hour, n, mean, m2 FROM {bath}_profile_day WHERE day >= ? AND day < ?",
+            (start_day, new_start),
+        )
+        for day, hour, n, mean, m2 in cursor.fetchall():
+            yield span, date.fromisoformat(day).weekday(), hour, Welford(n, mean, m2)
+
+
+def expire_profile(cursor: sqlite3.Cursor, bath: str, today: date):
+    """Subtract days that left a rolling window and drop partials older than KEEP_DAYS."""
+    for span, wd, hour, partial in list(_pending_expiry(cursor, bath, today)):
+        key = (span, wd, hour)
+        acc = _load_cell(cursor, f"{bath}_profile", "span = ? AND weekday = ? AND hour = ?", key)
+        acc.remove(partial)
+        cursor.execute(f"INSERT OR REPLACE INTO {bath}_profile VALUES (?, ?, ?, ?, ?, ?)", (*key, acc.n, acc.mean, acc.m2))
+
+    for span in ROLLING_SPANS:
+        new_start = span_start(today, span).isoformat()
+        cursor.execute(
+            f"UPDATE {bath}_profile_span SET start_day = ? WHERE span = ? AND start_day < ?",
+            (new_start, span, new_start),
+        )
+    cursor.execute(f"DELETE FROM {bath}_profile_day WHERE day < ?", (span_start(today, KEEP_DAYS).isoformat(),))
+
+
+def update_profile(cursor: sqlite3.Cursor, bath: str, timestamp: str, occupancy: float):
+    """Add one sample (ISO timestamp, occupancy %) to the bath's profile."""
+    day, hour = timestamp[:10], int(timestamp[11:13])
+    day_date = date.fromisoformat(day)
+    expire_profile(cursor, bath, day_date)
+
+    acc = _load_cell(cursor, f"{bath}_profile_day", "day = ? AND hour = ?", (day, hour))
+    acc.add(occupancy)
+    cursor.execute(f"INSERT OR REPLACE INTO {bath}_profile_day VALUES (?, ?, ?, ?, ?)", (day, hour, acc.n, acc.mean, acc.m2))
+
+    for span in SPANS:
+        key = (span, day_date.weekday(), hour)
+        acc = _load_cell(cursor, f"{bath}_profile", "span = ? AND weekday = ? AND hour = ?", key)
+        acc.add(occupancy)
+        cursor.execute(f"INSERT OR REPLACE INTO {bath}_profile VALUES (?, ?, ?, ?, ?, ?)", (*key, acc.n, acc.mean, acc.m2))
+
+
+def load_profile(bath: str, today: Optional[date] = None) -> Optional[pd.DataFrame]:
+    """
+    Profile of a bath as DataFrame (span, weekday, hour, n, occupancy, std),
+    one row per non-empty cell; None if the fetcher has not built it yet.
+
+    Read-only: days that left a window since the last stored sample (e.g.
+    while the bath was closed) are subtracted in memory.
+    """
+    if not DB_FILE.exists():
+        return None
+    today = today or date.today()
+
+    with sqlite3.connect(str(DB_FILE)) as conn:
+        cursor = conn.cursor()
+        if not has_profile(cursor, bath):
+            return None
+        cursor.execute(f"SELECT span, weekday, hour, n, mean, m2 FROM {bath}_profile")
+        cells = {(span, wd, hour): Welford(n, mean, m2) for span, wd, hour, n, mean, m2 in cursor.fetchall()}
+        for span, wd, hour, partial in list(_pending_expiry(cursor, bath, today)):
+            if (span, wd, hour) in cells:
+                cells[(span, wd, hour)].remove(partial)
+
+    rows = [
+        (span, wd, hour, acc.n, acc.mean, acc.std)
+        for (span, wd, hour), acc in sorted(cells.items())
+        if acc.n > 0
+    ]
+    return pd.DataFrame(rows, columns=["span", "weekday", "hour", "n", "occupancy", "std"])
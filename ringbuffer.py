@@ -0,0 +1,253 @@
+"""
+ringbuffer.py
+
+Fixed-size, memory-mapped ring buffer of recent samples per bath.
+
+The fetcher appends every stored sample to <RING_DIR>/<bath>.ring in addition
+to SQLite. The webserver maps the same file read-only and hands the columns
+to charts as NumPy views, so charts that only need recent data (see
+ChartBase.recent_days) never query SQLite.
+
+File layout (little endian):
+    header (64 bytes): magic, version, capacity, written, since
+    epoch      int64[capacity]    naive local time as seconds since 1970-01-01
+    occupancy  float64[capacity]  percent, 1 decimal
+    count      int32[capacity]    personCount
+
+`written` is the total number of samples ever appended; slot = written % capacity.
+`since` is the epoch from which the ring holds every sample that is in SQLite
+(set when the ring is created and seeded from the database).
+
+There is a single writer (the fetcher, every few minutes). The writer fills
+the slot before bumping `written`, so readers never see a half-written sample
+at the head.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import RING_DAYS, RING_DIR, RING_SAMPLES_PER_DAY
+
+MAGIC = b"BATHRING"
+VERSION = 1
+HEADER_SIZE = 64
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("capacity", "<u4"),
+    ("written", "<u8"),
+    ("since", "<i8"),
+])
+
+Columns = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def to_epoch(timestamp: str) -> int:
+    """Convert a stored ISO timestamp (naive local time) to ring epoch seconds."""
+    return int(datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp())
+
+
+def ring_path(bath: str) -> Path:
+    return Path(RING_DIR) / f"{bath}.ring"
+
+
+class SampleRing:
+    """Memory-mapped ring of (epoch, occupancy, count) samples for one bath."""
+
+    def __init__(self, path: Path, writable: bool = False):
+        self.path = Path(path)
+        mode = "r+" if writable else "r"
+        self.header = np.memmap(self.path, dtype=HEADER_DTYPE, mode=mode, shape=(1,))
+        if self.header["magic"][0] != MAGIC or self.header["version"][0] != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} sample ring")
+
+        self.capacity = int(self.header["capacity"][0])
+        offset = HEADER_SIZE
+        self.epoch = np.memmap(self.path, dtype="<i8", mode=mode, offset=offset, shape=(self.capacity,))
+        offset += 8 * self.capacity
+        self.occupancy = np.memmap(self.path, dtype="<f8", mode=mode, offset=offset, shape=(self.capacity,))
+        offset += 8 * self.capacity
+        self.count = np.memmap(self.path, dtype="<i4", mode=mode, offset=offset, shape=(self.capacity,))
+
+        stat = os.stat(self.path)
+        self.identity = (stat.st_ino, stat.st_size)
+
+    @classmethod
+    def create(cls, path: Path, capacity: int, since: int) -> "SampleRing":
+        """Create an empty ring file (atomically replacing any existing one) and open it writable."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as fh:
+            fh.truncate(HEADER_SIZE + 20 * capacity)
+        header = np.memmap(tmp, dtype=HEADER_DTYPE, mode="r+", shape=(1,))
+        header[0] = (MAGIC, VERSION, capacity, 0, since)
+        header.flush()
+        del header
+        os.replace(tmp, path)
+        return cls(path, writable=True)
+
+    @property
+    def written(self) -> int:
+        return int(self.header["written"][0])
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    def append(self, epoch: int, count: int, occupancy: float):
+        written = self.written
+        slot = written % self.capacity
+        self.epoch[slot] = epoch
+        self.occupancy[slot] = occupancy
+        self.count[slot] = count
+        self.header["written"][0] = written + 1
+        self.epoch.flush()
+        self.occupancy.flush()
+        self.count.flush()
+        self.header.flush()
+
+    def complete_since(self) -> int:
+        """Epoch from which the ring holds all samples (later of `since` and oldest kept sample)."""
+        since = int(self.header["since"][0])
+        written = self.written
+        if written > self.capacity:
+            since = max(since, int(self.epoch[written % self.capacity]))
+        return since
+
+    def latest_epoch(self) -> Optional[int]:
+        written = self.written
+        if written == 0:
+            return None
+        return int(self.epoch[(written - 1) % self.capacity])
+
+    def window(self, days: float) -> Optional[Columns]:
+        """
+        Samples of the last `days` days before the latest sample, or None if
+        the ring does not hold that window completely.
+        """
+        latest = self.latest_epoch()
+        if latest is None:
+            return None
+        cutoff = latest - int(days * 86400)
+        if self.complete_since() > cutoff:
+            return None
+
+        written = self.written
+        head = written % self.capacity
+        if written <= self.capacity or head == 0:
+            # chronological in place: slice views only
+            n = min(written, self.capacity)
+            start = int(np.searchsorted(self.epoch[:n], cutoff, side="left"))
+            return self.epoch[start:n], self.count[start:n], self.occupancy[start:n]
+
+        if int(self.epoch[0]) > cutoff:
+            # window reaches into the older segment [head, capacity): join once
+            start = head + int(np.searchsorted(self.epoch[head:], cutoff, side="left"))
+            return tuple(np.concatenate((arr[start:], arr[:head])) for arr in (self.epoch, self.count, self.occupancy))
+
+        start = int(np.searchsorted(self.epoch[:head], cutoff, side="left"))
+        return self.epoch[start:head], self.count[start:head], self.occupancy[start:head]
+
+
+def open_for_append(bath: str, cursor: sqlite3.Cursor) -> SampleRing:
+    """
+    Open the bath's ring for writing, creating it if missing.
+
+    A new ring is seeded with the last RING_DAYS days from the bath table so
+    it is complete from the start. An existing ring that is behind the table
+    (a committed sample was never appended) is reseeded the same way, so it
+    never serves a window with a hole. Call before inserting the current
+    sample.
+    """
+    path = ring_path(bath)
+    if path.exists():
+        try:
+            ring = SampleRing(path, writable=True)
+        except ValueError:
+            ring = None
+        if ring is not None:
+            cursor.execute(f"SELECT MAX(timestamp) FROM {bath}")
+            latest = cursor.fetchone()[0]
+            if latest is None or (ring.latest_epoch() or 0) >= to_epoch(latest):
+                return ring
+
+    capacity = RING_DAYS * RING_SAMPLES_PER_DAY
+    since_ts = (datetime.now() - timedelta(days=RING_DAYS)).isoformat(timespec="seconds")
+    cursor.execute(
+        f"SELECT timestamp, personCount, occupancy FROM {bath} WHERE timestamp >= ? ORDER BY timestamp",
+        (since_ts,),
+    )
+    rows = cursor.fetchall()[-capacity:]
+    since = to_epoch(rows[0][0]) if len(rows) == capacity else to_epoch(since_ts)
+
+    ring = SampleRing.create(path, capacity, since)
+    if rows:
+        n = len(rows)
+        ring.epoch[:n] = [to_epoch(ts) for ts, _, _ in rows]
+        ring.count[:n] = [count for _, count, _ in rows]
+        ring.occupancy[:n] = [occupancy for _, _, occupancy in rows]
+        ring.header["written"][0] = n
+        for arr in (ring.epoch, ring.occupancy, ring.count, ring.header):
+            arr.flush()
+    return ring
+
+
+def discard(bath: str):
+    """Remove a ring that failed to open or append; the next run rebuilds it."""
+    try:
+        ring_path(bath).unlink()
+    except OSError:
+        pass
+
+
+_readers = {}
+
+
+def open_for_read(bath: str) -> Optional[SampleRing]:
+    """Read-only ring for a bath, cached per process; None if there is none."""
+    path = ring_path(bath)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    ring = _readers.get(bath)
+    if ring is None or ring.identity != (stat.st_ino, stat.st_size):
+        try:
+            ring = SampleRing(path)
+        except (OSError, ValueError):
+            return None
+        _readers[bath] = ring
+    return ring
+
+
+def recent_frame(bath: str, days: float, latest: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    DataFrame (timestamp, personCount, occupancy) of the bath's last `days`
+    days, built on the ring's arrays; None if the ring cannot serve it.
+
+    `latest` is the newest timestamp in SQLite. The fetcher appends to the
+    ring only after its commit, so a ring that has not caught up yet returns
+    None rather than a frame that is missing that sample.
+    """
+    ring = open_for_read(bath)
+    if ring is None:
+        return None
+    if latest is not None and (ring.latest_epoch() or 0) < to_epoch(latest):
+        return None
+    columns = ring.window(days)
+    if columns is None:
+        return None
+    epoch, count, occupancy = columns
+    return pd.DataFrame(
+        {"timestamp": pd.to_datetime(epoch, unit="s"), "personCount": count, "occupancy": occupancy},
+        copy=False,
+    )
@@ -0,0 +1,129 @@
+"""
+sparkline.py
+
+Small inline SVG sparklines for the landing page cards: today's occupancy
+(half-hour averages) over the typical curve for today's weekday (hourly
+averages of the last TYPICAL_DAYS calendar days including today, read from
+the weekday x hour profile when available). Both series are aggregated, not
+drawn per sample, and rendered as plain SVG polylines, no Plotly.
+
+Rendered markup is cached per bath and data version (latest stored
+timestamp + today's date), so it is rebuilt only after the fetcher stored a
+new sample or the day changed.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from config import DB_FILE
+from profiles import load_profile, span_start
+
+TYPICAL_DAYS = 90  # one of profiles.SPANS
+
+# viewBox size; the svg is stretched to the card width
+WIDTH = 100
+HEIGHT = 24
+
+TODAY_STYLE = 'stroke="#0074D9"'
+TYPICAL_STYLE = 'stroke="currentColor" stroke-opacity="0.35" stroke-dasharray="3 2"'
+
+Points = List[Tuple[float, float]]  # (decimal hour, occupancy %)
+
+_cache: Dict[str, Tuple[str, str]] = {}
+
+
+def data_version(cursor: sqlite3.Cursor, bath: str) -> Optional[str]:
+    """Latest stored timestamp of a bath (index lookup), None if no data."""
+    try:
+        cursor.execute(f"SELECT MAX(timestamp) FROM {bath}")
+    except sqlite3.OperationalError:
+        return None
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def today_points(cursor: sqlite3.Cursor, bath: str, today: date) -> Points:
+    cursor.execute(
+        f"""
+        SELECT CAST(strftime('%H', timestamp) AS INTEGER) * 2
+                   + CAST(strftime('%M', timestamp) AS INTEGER) / 30 AS slot,
+               AVG(occupancy)
+        FROM {bath}
+        WHERE timestamp >= ? AND timestamp < ?
+        GROUP BY slot ORDER BY slot
+        """,
+        (today.isoformat(), (today + timedelta(days=1)).isoformat()),
+    )
+    return [(slot / 2 + 0.25, occupancy) for slot, occupancy in cursor.fetchall()]
+
+
+def typical_points(cursor: sqlite3.Cursor, bath: str, today: date) -> Points:
+    # the incremental profile (profiles.py) has the averages ready, with
+    # pending expiry applied; aggregate the same window from the history
+    # only if the fetcher has not built it yet
+    profile = load_profile(bath, today)
+    if profile is not None:
+        cells = profile[(profile["span"] == TYPICAL_DAYS) & (profile["weekday"] == today.weekday())]
+        return [(float(hour) + 0.5, float(occupancy)) for hour, occupancy in zip(cells["hour"], cells["occupancy"])]
+
+    cursor.execute(
+        f"""
+        SELECT CAST(strftime('%H', timestamp) AS INTEGER) AS hour, AVG(occupancy)
+        FROM {bath}
+        WHERE timestamp >= ? AND timestamp < ? AND strftime('%w', timestamp) = ?
+        GROUP BY hour ORDER BY hour
+        """,
+        (
+            span_start(today, TYPICAL_DAYS).isoformat(),
+            (today + timedelta(days=1)).isoformat(),
+            str(today.isoweekday() % 7),  # sqlite %w: 0 = Sunday
+        ),
+    )
+    return [(hour + 0.5, occupancy) for hour, occupancy in cursor.fetchall()]
+
+
+def polyline(points: Points, attrs: str) -> str:
+    if len(points) < 2:
+        return ""
+    coords = " ".join(
+        f"{hour / 24 * WIDTH:.1f},{HEIGHT - min(max(occ, 0), 100) / 100 * HEIGHT:.1f}"
+        for hour, occ in points
+    )
+    return f'<polyline {attrs} vector-effect="non-scaling-stroke" points="{coords}"/>'
+
+
+def render_svg(today: Points, typical: Points) -> str:
+    """SVG markup with the typical curve (dashed) behind today's curve."""
+    return (
+        f'<svg class="sparkline h-full w-full" viewBox="0 0 {WIDTH} {HEIGHT}" preserveAspectRatio="none" '
+        f'fill="none" stroke-width="1.5" stroke-linejoin="round" role="img" aria-label="Occupancy today vs. typical">'
+        f'{polyline(typical, TYPICAL_STYLE)}{polyline(today, TODAY_STYLE)}</svg>'
+    )
+
+
+def sparklines(baths, today: Optional[date] = None) -> Dict[str, str]:
+    """
+    Sparkline SVG per bath key. Baths without data get an empty string.
+    Only baths whose data version changed are re-queried.
+    """
+    today = today or date.today()
+    result = {key: "" for key in baths}
+    if not DB_FILE.exists():
+        return result
+
+    with sqlite3.connect(str(DB_FILE)) as conn:
+        cursor = conn.cursor()
+        for key in baths:
+            latest = data_version(cursor, key)
+            if latest is None:
+                continue
+            version = f"{today.isoformat()}|{latest}"
+            cached = _cache.get(key)
+            if cached is None or cached[0] != version:
+                svg = render_svg(today_points(cursor, key, today), typical_points(cursor, key, today))
+                cached = _cache[key] = (version, svg)
+            result[key] = cached[1]
+    return result
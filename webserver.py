@@ -3,15 +3,20 @@
 webserver.py
 
 Routing:
-- /                 -> landing page with cards grid
+- /                 -> landing page with cards grid (incl. SVG sparklines)
 - /<bath>/<chart>   -> per-bath per-chart page (e.g. /south/heatmap)
 
 Loads chart plugin classes from charts/ and invokes render() per page.
+Pages carry ETag/Last-Modified derived from the latest stored sample, are
+answered with 304 when unchanged and served precompressed (see page_cache.py).
 Assumes charts are in the `charts` package and each chart class subclasses
 charts.chart_base.ChartBase with attributes:
     - name (str): url key for chart, e.g. "heatmap"
     - title (str): human title
     - priority (int): sorting order
+    - recent_days (int | None): if set, data is served from the ring buffer
+    - uses_profile (bool): if set, the weekday x hour profile is passed instead
+      of the history (when the fetcher has built it)
 and method:
     - render(self) -> dict with {"title": str, "html": str}
 """
@@ -23,12 +28,16 @@ import pkgutil
 import sqlite3
 from datetime import datetime
 from pathlib import Path
-from typing import List, Type
+from typing import List, Optional, Type
 
 import pandas as pd
 from flask import Flask, abort, render_template, send_from_directory
 
 from config import BATHS, DB_FILE, IMAGE_DIR
+from page_cache import cached_page
+from profiles import load_profile
+from ringbuffer import recent_frame
+from sparkline import data_version, sparklines
 
 # charts.chart_base must exist inside charts package
 from charts.chart_base import ChartBase  # type: ignore
@@ -65,11 +74,42 @@ def load_chart_classes() -> List[Type[ChartBase]]:
 CHART_CLASSES = load_chart_classes()
 
 
+def load_history(bath: str) -> pd.DataFrame:
+    """Full history of a bath from sqlite (empty DataFrame if unavailable)."""
+    df = pd.DataFrame()
+    if DB_FILE.exists():
+        with sqlite3.connect(str(DB_FILE)) as conn:
+            # We intentionally do not limit by days here; plugins decide
+            try:
+                df = pd.read_sql_query(f"SELECT * FROM {bath} ORDER BY timestamp", conn)
+            except Exception:
+                # if table does not exist or other error, keep df empty
+                df = pd.DataFrame()
+
+    if not df.empty:
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df
+
+
+def latest_timestamp(*baths: str) -> Optional[str]:
+    """Latest stored timestamp over the given baths (the data version of their pages)."""
+    if not DB_FILE.exists():
+        return None
+    with sqlite3.connect(str(DB_FILE)) as conn:
+        cursor = conn.cursor()
+        versions = [data_version(cursor, bath) for bath in baths]
+    return max((v for v in versions if v), default=None)
+
+
 @app.route("/")
 def index():
     """Landing page: grid with all baths (cards)."""
-    # pass BATHS to template (labels + image links)
-    return render_template("index.html", baths=BATHS)
+    # pass BATHS to template (labels + image links) and today's sparklines
+    return cached_page(
+        "index",
+        latest_timestamp(*BATHS),
+        lambda: render_template("index.html", baths=BATHS, sparklines=sparklines(BATHS)),
+    )
 
 
 @app.route("/<bath>/<chart>")
@@ -88,22 +128,33 @@ def bath_chart(bath: str, chart: str):
     if chart_cls is None:
         abort(404)
 
-    # load data from sqlite
-    df = pd.DataFrame()
-    if DB_FILE.exists():
-        with sqlite3.connect(str(DB_FILE)) as conn:
-            # We intentionally do not limit by days here; plugins decide
-            try:
-                df = pd.read_sql_query(f"SELECT * FROM {bath} ORDER BY timestamp", conn)
-            except Exception:
-                # if table does not exist or other error, keep df empty
-                df = pd.DataFrame()
+    # conditional GET / precompressed variants; render only for a new data version
+    latest = latest_timestamp(bath)
+    return cached_page(f"{bath}/{chart}", latest, lambda: render_bath_chart(bath, chart, chart_cls, latest))
 
-    if not df.empty:
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
+
+def render_bath_chart(bath: str, chart: str, chart_cls: Type[ChartBase], latest: Optional[str]) -> str:
+    """
+    Load the chart's data, render the plugin and the page template.
+    `latest` is the page's data version; the page must include that sample.
+    """
+    # profile charts read 7 x 24 cells per window, recent-window charts the
+    # memory-mapped ring buffer (no SQLite); otherwise, or if neither is
+    # available, load the full history from sqlite
+    df = None
+    profile = None
+    if chart_cls.uses_profile:
+        profile = load_profile(bath)
+        if profile is not None:
+            df = pd.DataFrame()
+    elif chart_cls.recent_days:
+        df = recent_frame(bath, chart_cls.recent_days, latest)
+
+    if df is None:
+        df = load_history(bath)
 
     # instantiate plugin and render
-    chart_instance = chart_cls(bath, df)
+    chart_instance = chart_cls(bath, df, profile)
     rendered = chart_instance.render()
     chart_title = rendered.get("title", getattr(chart_cls, "title", chart))
     chart_html = rendered.get("html", "<p>No chart produced.</p>")